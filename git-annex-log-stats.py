@@ -1,125 +1,569 @@
 #!/usr/bin/env python3
+import argparse
 import asyncio
+import glob
 import subprocess
 import json
+import multiprocessing
 import os
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import git
-from tqdm import tqdm
-import aiofiles
+from tqdm.asyncio import tqdm
 
-async def has_git_annex(repo_path):
-    """Check if the repository has a git-annex branch locally or in any remote."""
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Maximum number of commits processed concurrently
+MAX_CONCURRENT_COMMITS = 16
+# Number of consecutive commits handed to a worker process at a time
+COMMITS_PER_CHUNK = 200
+# Line fed to `git diff-tree --stdin` after each request; it is not a commit
+# so diff-tree echoes it back, marking the end of the preceding diff
+DIFF_TREE_SENTINEL = b'end-of-diff\n'
+# Largest regular blob checked for being an unlocked git-annex pointer file
+MAX_POINTER_SIZE = 4096
+
+# A commit as listed by `git rev-list`; parent is the first parent sha or None
+Commit = namedtuple('Commit', ['hexsha', 'committed_date', 'tree', 'parent'])
+
+def json_dumps(data, indent=False):
+    """Serialize data to JSON bytes, with orjson when available."""
+    if orjson is not None:
+        return orjson.dumps(data, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(data, indent=2 if indent else None).encode()
+
+def json_loads(content):
+    """Deserialize JSON from bytes or str, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def is_regular_file(mode):
+    """Whether an octal git tree mode denotes a regular (non-symlink) file blob."""
+    return int(mode, 8) & 0o170000 == 0o100000
+
+def is_blob(mode):
+    """Whether an octal git tree mode denotes a blob (regular file or symlink)."""
+    return int(mode, 8) & 0o170000 in (0o100000, 0o120000)
+
+async def list_commits_async(repo_path):
+    """List the commits reachable from HEAD, parents before their children.
+
+    Commits are streamed from `git rev-list` rather than loaded as GitPython
+    objects.
+    """
+    cmd = ['git', '-C', repo_path, 'rev-list', '--topo-order', '--reverse',
+           '--format=%H %ct %T %P', 'HEAD']
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    commits = []
+    async for line in proc.stdout:
+        # Each formatted line is preceded by a "commit <sha>" header
+        if line.startswith(b'commit '):
+            continue
+        hexsha, committed_date, tree, *parents = line.decode().split()
+        commits.append(Commit(hexsha, int(committed_date), tree, parents[0] if parents else None))
+    await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}")
+    return commits
+
+def is_bare_git_dir(path):
+    """Whether path looks like a git directory, as git itself checks it."""
+    return (os.path.isfile(os.path.join(path, 'HEAD'))
+            and os.path.isdir(os.path.join(path, 'objects'))
+            and os.path.isdir(os.path.join(path, 'refs')))
+
+def get_git_dir(repo_path):
+    """Returns the directory holding the refs of a work tree or bare repository.
+
+    Like git, it is looked up in repo_path and then in its parent directories,
+    so repo_path may be a subdirectory of a work tree.
+    """
+    path = os.path.abspath(repo_path)
+    while True:
+        git_dir = os.path.join(path, '.git')
+        if os.path.isfile(git_dir):
+            # Linked worktrees and submodules point to their git directory
+            with open(git_dir) as f:
+                git_dir = os.path.join(path, f.read().strip()[len('gitdir:'):].strip())
+            break
+        if os.path.isdir(git_dir):
+            break
+        if is_bare_git_dir(path):
+            git_dir = path
+            break
+        parent = os.path.dirname(path)
+        if parent == path:
+            raise RuntimeError(f"No git repository found at {repo_path}")
+        path = parent
+    # Refs of linked worktrees live in the common git directory
+    commondir = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir):
+        with open(commondir) as f:
+            git_dir = os.path.join(git_dir, f.read().strip())
+    return git_dir
+
+def has_git_annex(repo_path):
+    """Check if the repository has a git-annex branch locally or in any remote.
+
+    Refs are looked up directly in the git directory, both as loose ref files
+    and in packed-refs, without spawning git.
+    """
     try:
-        # Check for local git-annex branch
-        cmd = ['git', '-C', repo_path, 'show-ref', '--verify', 'refs/heads/git-annex']
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await proc.wait()
-        if proc.returncode == 0:
+        git_dir = get_git_dir(repo_path)
+        # Check for loose local or remote git-annex branch
+        if os.path.isfile(os.path.join(git_dir, 'refs', 'heads', 'git-annex')):
             return True
-            
-        # Check for git-annex branch in any remote
-        cmd = ['git', '-C', repo_path, 'show-ref', '--verify', 'refs/remotes/*/git-annex']
-        proc = await asyncio.create_subprocess_exec(
-            *cmd,
-            stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE
-        )
-        await proc.wait()
-        if proc.returncode == 0:
+        if glob.glob(os.path.join(glob.escape(git_dir), 'refs', 'remotes', '*', 'git-annex')):
             return True
-            
+
+        # Check for packed local or remote git-annex branch
+        packed_refs = os.path.join(git_dir, 'packed-refs')
+        if os.path.isfile(packed_refs):
+            with open(packed_refs, 'rb') as f:
+                for line in f:
+                    # <sha> SP <refname>, or comments and ^<sha> peeled tags
+                    ref = line.rstrip(b'\n').partition(b' ')[2]
+                    if ref == b'refs/heads/git-annex' or (
+                            ref.startswith(b'refs/remotes/') and ref.endswith(b'/git-annex')):
+                        return True
+
         return False
-    except Exception as e:
+    except OSError as e:
         print(f"Error checking for git-annex branch: {e}")
         return False
 
-async def get_annex_size_async(repo_path, commit, has_annex):
-    """Returns the size of annexed files for a given commit asynchronously."""
-    if not has_annex:
-        return 0
-        
-    cmd = ['git', '-C', repo_path, 'annex', 'info', '--bytes', '--json', commit]
-    try:
+class BatchProcess:
+    """A persistent process answering requests fed to its stdin.
+
+    Requests are served in FIFO order; `lock` must be held for the whole
+    write/read exchange so that concurrent callers do not interleave.
+    """
+
+    def __init__(self, proc):
+        self.proc = proc
+        self.lock = asyncio.Lock()
+
+    @classmethod
+    async def start(cls, cmd):
         proc = await asyncio.create_subprocess_exec(
             *cmd,
+            stdin=asyncio.subprocess.PIPE,
             stdout=asyncio.subprocess.PIPE,
-            stderr=asyncio.subprocess.PIPE,
         )
-        stdout, stderr = await proc.communicate()
-        if proc.returncode != 0:
-            print(f"Error retrieving annex size for commit {commit}: {stderr.decode()}")
+        return cls(proc)
+
+    async def stop(self):
+        """Close the stdin of the process and wait for it to exit."""
+        self.proc.stdin.close()
+        await self.proc.wait()
+
+async def start_cat_file_batch_check(repo_path):
+    """Start a persistent `git cat-file --batch-check` process reporting object sizes."""
+    return await BatchProcess.start(
+        ['git', '-C', repo_path, 'cat-file', '--batch-check=%(objectsize)'])
+
+async def start_cat_file_batch(repo_path):
+    """Start a persistent `git cat-file --batch` process returning object contents."""
+    return await BatchProcess.start(
+        ['git', '-C', repo_path, 'cat-file', '--batch'])
+
+async def start_diff_tree_batch(repo_path):
+    """Start a persistent `git diff-tree --stdin` process listing changed blobs."""
+    return await BatchProcess.start(
+        ['git', '-C', repo_path, 'diff-tree', '--stdin', '-r', '--root', '--no-renames', '--no-commit-id'])
+
+def get_annex_key_size(link, is_pointer):
+    """Returns the size encoded in the git-annex key an annexed file links to.
+
+    `link` is the target of an annex symlink, or the content of an unlocked
+    pointer file (`is_pointer`).  Keys look like `SHA256E-s1234--<hash>.ext`;
+    0 is returned for anything else and for keys without a size field, which
+    `git annex info` reports as of unknown size.
+    """
+    link = link.split(b'\n', 1)[0]
+    if is_pointer:
+        if not link.startswith(b'/annex/objects/'):
             return 0
-        annex_info = json.loads(stdout.decode())
-        # could be "size of annexed files in tree": "819104023 (+ 7 unknown size)"
-        return int(annex_info.get('size of annexed files in tree', "0").split()[0])
-    except Exception as e:
-        print(f"Error retrieving annex size for commit {commit} using {' '.join(cmd)} : {e}")
+    elif b'annex/objects/' not in link:
         return 0
+    key = link.rsplit(b'/', 1)[-1]
+    # Fields of the key, after the backend name and before the "--"
+    for field in key.split(b'--', 1)[0].split(b'-')[1:]:
+        if field[:1] == b's' and field[1:].isdigit():
+            return int(field[1:])
+    return 0
+
+class SizeLookup:
+    """Sizes of blobs and of the annex keys they refer to.
+
+    Looks them up through persistent `git cat-file` processes and caches them
+    by blob sha, so every blob is looked up once across all commits.  Annex
+    key sizes are only looked up when `cat_file_proc` is given.
+    """
+
+    def __init__(self, cat_file_check_proc, cat_file_proc=None):
+        self.cat_file_check_proc = cat_file_check_proc
+        self.cat_file_proc = cat_file_proc
+        self.blob_sizes = {}
+        self.annex_key_sizes = {}
+
+    async def _get_blob_sizes(self, blob_shas):
+        """Look up the sizes of blobs missing from the `blob_sizes` cache.
+
+        All unknown blobs are sent to the `git cat-file --batch-check`
+        process in one go while its answers are read back in the same order.
+        All answers are read before raising for blobs which are missing from
+        the repository, so the next lookup starts at its own answers.
+        """
+        batch = self.cat_file_check_proc
+        async with batch.lock:
+            missing = [sha for sha in dict.fromkeys(blob_shas) if sha not in self.blob_sizes]
+            if not missing:
+                return
+
+            async def feed():
+                for sha in missing:
+                    batch.proc.stdin.write(sha + b'\n')
+                    await batch.proc.stdin.drain()
+
+            feeder = asyncio.create_task(feed())
+            unreadable = []
+            try:
+                for sha in missing:
+                    line = await batch.proc.stdout.readline()
+                    if not line:
+                        raise RuntimeError("git cat-file --batch-check exited")
+                    # Missing objects are answered with `<sha> missing`
+                    if not line.strip().isdigit():
+                        unreadable.append(sha.decode())
+                        continue
+                    self.blob_sizes[sha] = int(line)
+            finally:
+                await feeder
+            if unreadable:
+                raise RuntimeError(f"Cannot get the size of blobs {', '.join(unreadable)}")
+
+    async def _get_annex_key_sizes(self, links):
+        """Look up annex key sizes of (sha, is_pointer) links missing from the cache.
 
-async def process_commit(repo_path, commit, results, output_filename, has_annex):
-    """Process a single commit and update results."""
+        Contents are read from the `git cat-file --batch` process, which
+        answers every sha with `<sha> <type> <size>` and then the content, or
+        with `<sha> missing` alone.  All answers are read before raising for
+        missing blobs, so the next lookup starts at its own answers.
+        """
+        batch = self.cat_file_proc
+        async with batch.lock:
+            missing = {sha: is_pointer for sha, is_pointer in links
+                       if sha not in self.annex_key_sizes}
+            if not missing:
+                return
+
+            async def feed():
+                for sha in missing:
+                    batch.proc.stdin.write(sha + b'\n')
+                    await batch.proc.stdin.drain()
+
+            feeder = asyncio.create_task(feed())
+            unreadable = []
+            try:
+                for sha, is_pointer in missing.items():
+                    header = await batch.proc.stdout.readline()
+                    if not header:
+                        raise RuntimeError("git cat-file --batch exited")
+                    fields = header.split()
+                    if len(fields) != 3:
+                        unreadable.append(sha.decode())
+                        continue
+                    content = await batch.proc.stdout.readexactly(int(fields[2]) + 1)
+                    self.annex_key_sizes[sha] = get_annex_key_size(content[:-1], is_pointer)
+            finally:
+                await feeder
+            if unreadable:
+                raise RuntimeError(f"Cannot read the annex links in blobs {', '.join(unreadable)}")
+
+    async def get_entries_sizes(self, entries):
+        """Returns the git and annex sizes of (mode, sha) blob entries of a tree.
+
+        The git size sums regular blobs (not symlinks).  The annex size sums
+        the sizes of the annex keys that symlinks and unlocked pointer files
+        (regular blobs up to MAX_POINTER_SIZE) refer to.
+        """
+        regular_shas = [sha for mode, sha in entries if is_regular_file(mode)]
+        await self._get_blob_sizes(regular_shas)
+        git_size = sum(self.blob_sizes[sha] for sha in regular_shas)
+        if self.cat_file_proc is None:
+            return git_size, 0
+
+        links = [(sha, False) for mode, sha in entries if int(mode, 8) == 0o120000]
+        links += [(sha, True) for sha in regular_shas if self.blob_sizes[sha] <= MAX_POINTER_SIZE]
+        await self._get_annex_key_sizes(links)
+        return git_size, sum(self.annex_key_sizes[sha] for sha, _ in links)
+
+async def get_sizes_async(repo_path, commit, size_lookup):
+    """Returns the git and annex sizes of the tree of a given commit.
+
+    The tree is listed natively by `git ls-tree -r`; sizes of its blobs are
+    resolved through `size_lookup`.
+    """
+    cmd = ['git', '-C', repo_path, 'ls-tree', '-r', commit]
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+    )
+    entries = []
+    # <mode> SP <type> SP <object> TAB <file>
+    async for line in proc.stdout:
+        mode, obj_type, sha = line.split(None, 3)[:3]
+        if obj_type == b'blob':
+            entries.append((mode, sha))
+    await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} exited with {proc.returncode}")
+    return await size_lookup.get_entries_sizes(entries)
+
+async def get_sizes_delta_async(diff_tree_proc, size_lookup, parent, commit):
+    """Returns the change in git and annex sizes from parent to commit.
+
+    Only the entries changed between the two commits are listed by the
+    persistent `git diff-tree --stdin` process, which skips identical sub-trees.
+    Without a parent (a root commit) all entries are listed as added.
+    """
+    removed = []
+    added = []
+    request = f"{commit} {parent}\n" if parent else f"{commit}\n"
+    async with diff_tree_proc.lock:
+        diff_tree_proc.proc.stdin.write(request.encode() + DIFF_TREE_SENTINEL)
+        await diff_tree_proc.proc.stdin.drain()
+        while True:
+            line = await diff_tree_proc.proc.stdout.readline()
+            if line == DIFF_TREE_SENTINEL:
+                break
+            if not line:
+                raise RuntimeError("git diff-tree --stdin exited")
+            # :<old mode> SP <new mode> SP <old sha> SP <new sha> SP <status> TAB <path>
+            old_mode, new_mode, old_sha, new_sha = line[1:].split(None, 4)[:4]
+            if is_blob(old_mode):
+                removed.append((old_mode, old_sha))
+            if is_blob(new_mode):
+                added.append((new_mode, new_sha))
+    removed_git_size, removed_annex_size = await size_lookup.get_entries_sizes(removed)
+    added_git_size, added_annex_size = await size_lookup.get_entries_sizes(added)
+    return added_git_size - removed_git_size, added_annex_size - removed_annex_size
+
+async def process_commit(repo_path, commit, parent_sizes, results,
+                         diff_tree_proc, size_lookup, tree_sizes):
+    """Process a single commit and update results.
+
+    Commits whose tree was already seen (reverts, merges, cherry-picks)
+    reuse its git and annex sizes from `tree_sizes`.  Otherwise, when the
+    sizes of the (first) parent are known, only the difference to them is
+    computed rather than summing the whole tree again.  Root commits are
+    listed by the same persistent diff-tree process.
+    """
     try:
         # Get commit timestamp and format it
         commit_time = datetime.fromtimestamp(commit.committed_date)
         commit_time_str = commit_time.isoformat()
         
-        # Get the size of annexed files only if git-annex is used
-        annex_size = await get_annex_size_async(repo_path, commit.hexsha, has_annex)
-        
-        # Get the total size of the git objects
-        git_size = sum((item.size for item in commit.tree.traverse()
-                        if item.type == 'blob' and item.mode != 0o120000), 0)
+        tree_sha = commit.tree
+        if tree_sha in tree_sizes:
+            git_size, annex_size = tree_sizes[tree_sha]
+        elif parent_sizes is None and commit.parent is not None:
+            # The parent is not available (e.g. in another range of commits)
+            git_size, annex_size = await get_sizes_async(repo_path, commit.hexsha, size_lookup)
+            tree_sizes[tree_sha] = (git_size, annex_size)
+        else:
+            git_size, annex_size = parent_sizes or (0, 0)
+            git_delta, annex_delta = await get_sizes_delta_async(
+                diff_tree_proc, size_lookup, commit.parent, commit.hexsha)
+            git_size += git_delta
+            annex_size += annex_delta
+            tree_sizes[tree_sha] = (git_size, annex_size)
         
         # Store the results
         results[commit.hexsha] = {
             'timestamp': commit_time_str,
+            'tree': tree_sha,
             'git_size': git_size,
             'annex_size': annex_size,
             'total_size': git_size + annex_size
         }
-        
-        # Save the updated results
-        await write_json_async(output_filename, results)
     except Exception as e:
         print(f"Error processing commit {commit.hexsha}: {e}")
 
-async def write_json_async(output_filename, data):
-    """Writes the data to a JSON file asynchronously."""
-    async with aiofiles.open(output_filename, 'w') as f:
-        await f.write(json.dumps(data, indent=4))
+def get_tree_sizes(results):
+    """Returns (git_size, annex_size) of the trees recorded in results, keyed by tree sha."""
+    return {result['tree']: (result['git_size'], result['annex_size'])
+            for result in results.values() if 'tree' in result}
+
+def write_json(output_filename, data):
+    """Writes the data to a JSON file."""
+    with open(output_filename, 'wb') as f:
+        f.write(json_dumps(data, indent=True))
 
-async def load_existing_results(output_filename):
-    """Load existing results from file if it exists."""
+def append_jsonl(f, hexsha, result):
+    """Appends the result of a single commit as one JSON line and flushes it."""
+    f.write(json_dumps({'sha': hexsha, **result}) + b'\n')
+    f.flush()
+
+def load_existing_results(output_filename, journal_filename):
+    """Load existing results from file and from the journal of an unfinished run."""
+    results = {}
     if os.path.exists(output_filename):
         try:
-            async with aiofiles.open(output_filename, 'r') as f:
-                content = await f.read()
-                return json.loads(content)
+            with open(output_filename, 'rb') as f:
+                results = json_loads(f.read())
         except Exception as e:
             print(f"Error loading existing results: {e}")
-    return {}
+    if os.path.exists(journal_filename):
+        with open(journal_filename, 'rb') as f:
+            for line in f:
+                try:
+                    result = json_loads(line)
+                except ValueError:
+                    # A line cut short when the run was killed
+                    continue
+                results[result.pop('sha')] = result
+    return results
 
-async def get_git_and_annex_sizes_async(repo_path, output_filename):
-    """Traverse the git history and gather size data asynchronously."""
-    repo = git.Repo(repo_path)
-    
+async def process_commits_async(repo_path, has_annex, commits, results,
+                                on_result=None, show_progress=True, tree_sizes=None):
+    """Process commits (parents before children) and store their sizes in results.
+
+    Sizes of parents already present in results are reused, as are those of
+    trees in `tree_sizes` (by default the trees recorded in results).
+    `on_result`, if given, is called with the sha of every successfully
+    processed commit.
+    """
+    # Single long-running git processes serve all commits; file contents
+    # are only needed to find annex keys
+    diff_tree_proc = await start_diff_tree_batch(repo_path)
+    cat_file_check_proc = await start_cat_file_batch_check(repo_path)
+    cat_file_proc = await start_cat_file_batch(repo_path) if has_annex else None
+    # Sizes of blobs and of whole trees already seen, shared across commits
+    size_lookup = SizeLookup(cat_file_check_proc, cat_file_proc)
+    if tree_sizes is None:
+        tree_sizes = get_tree_sizes(results)
+    # Git and annex sizes of commits being processed, awaited by their children
+    loop = asyncio.get_running_loop()
+    commit_sizes = {commit.hexsha: loop.create_future() for commit in commits}
+
+    # Bound the number of commits (and thus git subprocesses) in flight
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_COMMITS)
+
+    async def run(commit):
+        try:
+            parent = commit.parent
+            # Wait for the parent outside of the semaphore so that waiting
+            # children never hold up the parents they depend on
+            if parent in results:
+                parent_sizes = (results[parent]['git_size'], results[parent]['annex_size'])
+            elif parent in commit_sizes:
+                parent_sizes = await commit_sizes[parent]
+            else:
+                parent_sizes = None
+            async with semaphore:
+                await process_commit(repo_path, commit, parent_sizes, results,
+                                     diff_tree_proc, size_lookup, tree_sizes)
+        finally:
+            result = results.get(commit.hexsha)
+            commit_sizes[commit.hexsha].set_result(
+                (result['git_size'], result['annex_size']) if result else None)
+        return commit
+
+    # Process commits with a progress bar
+    try:
+        tasks = [asyncio.ensure_future(run(commit)) for commit in commits]
+        for task in tqdm.as_completed(tasks, desc="Processing commits",
+                                      disable=not show_progress):
+            commit = await task
+            if on_result is not None and commit.hexsha in results:
+                on_result(commit.hexsha)
+    finally:
+        await diff_tree_proc.stop()
+        await cat_file_check_proc.stop()
+        if cat_file_proc is not None:
+            await cat_file_proc.stop()
+
+# Sizes of trees seen by a worker process, seeded by init_worker and
+# accumulated over all the ranges of commits the worker processes
+worker_tree_sizes = {}
+
+def init_worker(tree_sizes):
+    """Seed the tree size cache of a worker process."""
+    worker_tree_sizes.update(tree_sizes)
+
+def process_chunk(repo_path, has_annex, commits, parent_results):
+    """Process a range of commits in a worker process.
+
+    The worker runs its own event loop and git/annex batch processes, and
+    returns the results of the given commits only.
+    """
+    results = dict(parent_results)
+    asyncio.run(process_commits_async(repo_path, has_annex, commits, results,
+                                      show_progress=False, tree_sizes=worker_tree_sizes))
+    return {commit.hexsha: results[commit.hexsha]
+            for commit in commits if commit.hexsha in results}
+
+async def process_chunks_async(repo_path, has_annex, commits, results, jobs, on_result):
+    """Process ranges of commits in parallel worker processes.
+
+    Each range of COMMITS_PER_CHUNK consecutive commits is handled by
+    process_chunk; results are merged and reported as ranges complete.
+    """
+    loop = asyncio.get_running_loop()
+    # spawn, since forking a process with a running event loop is unsafe
+    mp_context = multiprocessing.get_context('spawn')
+    with ProcessPoolExecutor(max_workers=jobs, mp_context=mp_context,
+                             initializer=init_worker,
+                             initargs=(get_tree_sizes(results),)) as executor:
+
+        async def run(chunk):
+            # Results of parents from earlier runs let workers start from deltas
+            parent_results = {commit.parent: results[commit.parent]
+                              for commit in chunk if commit.parent in results}
+            chunk_results = await loop.run_in_executor(
+                executor, process_chunk, repo_path, has_annex, chunk, parent_results)
+            return chunk, chunk_results
+
+        chunks = [commits[i:i + COMMITS_PER_CHUNK]
+                  for i in range(0, len(commits), COMMITS_PER_CHUNK)]
+        with tqdm(total=len(commits), desc="Processing commits") as progress:
+            for future in asyncio.as_completed([run(chunk) for chunk in chunks]):
+                chunk, chunk_results = await future
+                results.update(chunk_results)
+                for hexsha in chunk_results:
+                    on_result(hexsha)
+                progress.update(len(chunk))
+
+async def get_git_and_annex_sizes_async(repo_path, output_filename, jobs=1):
+    """Traverse the git history and gather size data asynchronously.
+
+    With jobs > 1, ranges of commits are processed in that many worker processes.
+    """
     # Check if the repository uses git-annex
-    has_annex = await has_git_annex(repo_path)
+    has_annex = has_git_annex(repo_path)
     if has_annex:
         print("Git-annex branch detected. Will calculate annex sizes.")
     else:
         print("No git-annex branch found. Will only calculate git object sizes.")
     
+    # Results are journaled to an append-only JSON lines sidecar while
+    # processing and consolidated into output_filename at the end
+    journal_filename = output_filename + '.jsonl'
+
     # Load existing results to avoid reprocessing
-    results = await load_existing_results(output_filename)
+    results = load_existing_results(output_filename, journal_filename)
     
-    # Get all commits
-    all_commits = list(repo.iter_commits())
+    # Get all commits, parents before their children
+    all_commits = await list_commits_async(repo_path)
     
     # Filter out already processed commits
     commits_to_process = [commit for commit in all_commits if commit.hexsha not in results]
@@ -127,28 +571,40 @@ async def get_git_and_annex_sizes_async(repo_path, output_filename):
     print(f"Total commits: {len(all_commits)}")
     print(f"Already processed: {len(all_commits) - len(commits_to_process)}")
     print(f"Commits to process: {len(commits_to_process)}")
-    
-    # Process commits with a progress bar
-    for commit in tqdm(commits_to_process, desc="Processing commits"):
-        await process_commit(repo_path, commit, results, output_filename, has_annex)
-    
+
+    with open(journal_filename, 'ab') as journal:
+
+        def on_result(hexsha):
+            append_jsonl(journal, hexsha, results[hexsha])
+
+        try:
+            if jobs > 1:
+                await process_chunks_async(repo_path, has_annex, commits_to_process, results,
+                                           jobs, on_result)
+            else:
+                await process_commits_async(repo_path, has_annex, commits_to_process, results,
+                                            on_result)
+        finally:
+            # Save whatever was processed, also when interrupted
+            write_json(output_filename, results)
+    os.remove(journal_filename)
+
     return results
 
-async def main_async(repo_path, output_filename):
+async def main_async(repo_path, output_filename, jobs=1):
     """Main async function."""
-    results = await get_git_and_annex_sizes_async(repo_path, output_filename)
+    results = await get_git_and_annex_sizes_async(repo_path, output_filename, jobs)
     print(f"Processed {len(results)} commits. Results saved to {output_filename}")
 
-def main(repo_path, output_filename):
+def main(repo_path, output_filename, jobs=1):
     """Main function that runs the async event loop."""
-    asyncio.run(main_async(repo_path, output_filename))
+    asyncio.run(main_async(repo_path, output_filename, jobs))
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) != 3:
-        print(f"Usage: {sys.argv[0]} <repo_path> <output_filename>")
-        sys.exit(1)
-    
-    repo_path = sys.argv[1]
-    output_filename = sys.argv[2]
-    main(repo_path, output_filename)
+    parser = argparse.ArgumentParser(description='Gather git and git-annex sizes for every commit of a repository')
+    parser.add_argument('repo_path', help='Path to the git repository')
+    parser.add_argument('output_filename', help='JSON file to store (and resume from) the results')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                        help='Number of worker processes handling ranges of commits (default: 1)')
+    args = parser.parse_args()
+    main(args.repo_path, args.output_filename, args.jobs)
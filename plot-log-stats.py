@@ -1,16 +1,56 @@
 #!/usr/bin/env python3
+import hashlib
 import json
+import math
 import os
 import glob
-from datetime import datetime
-from collections import defaultdict
+import gzip
+import re
+import shutil
+import tempfile
+from collections import defaultdict, namedtuple
 import argparse
+from concurrent.futures import ProcessPoolExecutor
+import matplotlib
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
+from matplotlib.collections import PolyCollection
+from matplotlib.lines import Line2D
 import numpy as np
 import humanize
 import itertools
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Size fields of the commit records, also used as keys of the monthly data
+SIZE_FIELDS = ('git_size', 'annex_size', 'total_size')
+# Commits of one repository: datetime64[M] months and aligned int64 size arrays
+RepoData = namedtuple('RepoData', ['months', *SIZE_FIELDS])
+# Size with an optional unit, e.g. 1GB, 1.5 TiB, 500M or 1e9
+SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d*)?(?:e[+-]?\d+)?|\.\d+)\s*([KMGTPE]?)(i?)B?\s*$', re.IGNORECASE)
+# Binary units of sizes on the y-axis, one per power of 1024
+SIZE_UNITS = ('Bytes', 'KiB', 'MiB', 'GiB', 'TiB', 'PiB', 'EiB', 'ZiB', 'YiB')
+# Fewer files than this are loaded serially, not worth starting processes
+MIN_FILES_FOR_POOL = 4
+# Rendered plots, named after a hash of their data and options
+CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'),
+                         'git-annex-log-stats')
+# Arguments which do not change the rendered plot
+NON_PLOT_ARGS = ('group', 'input_pattern', 'output', 'no_cache', 'no_show')
+# Output formats for which the resolution does not matter
+VECTOR_EXTENSIONS = ('.svg', '.svgz', '.pdf', '.eps', '.ps')
+# Matplotlib backends which can only save plots, not display them
+NON_INTERACTIVE_BACKENDS = ('agg', 'cairo', 'pdf', 'pgf', 'ps', 'svg', 'template')
+
+def json_loads(content):
+    """Deserialize JSON from bytes or str, with orjson when available."""
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 def parse_args():
     parser = argparse.ArgumentParser(description='Generate size plots from git-annex JSON statistics files')
     # Group arguments
@@ -30,173 +70,305 @@ def parse_args():
                         help='Add a line showing the total across all groups')
     parser.add_argument('--total-minimum', type=str, default='1GB',
                         help='Minimum total size to show on the plot (default: 1GB)')
+    parser.add_argument('--dpi', type=int, default=150,
+                        help='Resolution of raster (e.g. PNG) outputs in dots per inch (default: 150)')
+    parser.add_argument('--max-points', type=int, default=600,
+                        help='Downsample lines with more points than this, 0 to disable (default: 600)')
+    parser.add_argument('--no-show', action='store_true',
+                        help='Only save the plot, do not display it')
+    parser.add_argument('--no-cache', action='store_true',
+                        help=f'Always load the files and render the plot, without looking them up in or storing them to {CACHE_DIR}')
     args = parser.parse_args()
     # Validate arguments
     if args.group is None and args.input_pattern is None:
         parser.error("Either --group or input_pattern must be provided")
+    if args.max_points < 0 or 0 < args.max_points < 3:
+        parser.error("--max-points must be 0 or at least 3")
     return args
 
 def parse_size(size_str):
-    """Convert a human-readable size string to bytes."""
-    units = {
-        'B': 1,
-        'KB': 1024,
-        'MB': 1024**2,
-        'GB': 1024**3,
-        'TB': 1024**4,
-        'PB': 1024**5
-    }
-    
-    # Extract the number and unit
-    size = size_str.strip()
-    if size[-2:] in units:
-        num = float(size[:-2])
-        unit = size[-2:]
-    elif size[-1:] in ['B']:
-        num = float(size[:-1])
-        unit = size[-1:]
-    else:
+    """Convert a human-readable size string to bytes.
+
+    Units are powers of 1024, whether written as KB or KiB (K, M, G, T, P
+    or E prefix), the same as the sizes shown on the plot.
+    """
+    match = SIZE_RE.match(size_str)
+    if not match or (match[3] and not match[2]):
+        raise ValueError(f"Invalid size format: {size_str}")
+    num, prefix = float(match[1]), match[2].upper()
+    return num * 1024 ** ('KMGTPE'.index(prefix) + 1) if prefix else num
+
+def get_repo_data(commits):
+    """Get the RepoData of a collection of commit records."""
+    # ISO timestamps start with the year and month, no need to parse them
+    months = np.array([commit_data['timestamp'][:7] for commit_data in commits],
+                      dtype='datetime64[M]')
+    # Read the sizes straight into an int64 buffer, one row per commit
+    sizes = np.fromiter((commit_data[field] for commit_data in commits for field in SIZE_FIELDS),
+                        dtype=np.int64, count=len(commits) * len(SIZE_FIELDS)).reshape(-1, len(SIZE_FIELDS))
+    return RepoData(months, *sizes.T)
+
+def load_json_file(filename):
+    """Load one JSON statistics file, gzip-compressed if its name ends with .gz.
+
+    Returns the RepoData of the repository, None and the errors of commits
+    skipped for missing or invalid fields, or None, the error and no commit
+    errors if the file can't be loaded.
+    """
+    commit_errors = []
+    try:
+        with (gzip.open if filename.endswith('.gz') else open)(filename, 'rb') as f:
+            data = json_loads(f.read())
         try:
-            return float(size)
-        except ValueError:
-            raise ValueError(f"Invalid size format: {size_str}")
-    
-    return num * units.get(unit, 1)
+            repo_data = get_repo_data(data.values())
+        except (KeyError, TypeError, ValueError):
+            # Find and skip the invalid commits, only for files having any
+            valid_commits = []
+            for commit_hash, commit_data in data.items():
+                try:
+                    get_repo_data([commit_data])
+                except (KeyError, TypeError, ValueError) as e:
+                    commit_errors.append(f"Error processing commit {commit_hash}: {e}")
+                else:
+                    valid_commits.append(commit_data)
+            repo_data = get_repo_data(valid_commits)
+    except Exception as e:
+        return None, e, []
+    return repo_data, None, commit_errors
 
-def load_json_files(patterns):
-    """Load all JSON files matching the patterns."""
-    all_data = []
-    file_count = 0
-    # Handle single pattern or list of patterns
+def expand_patterns(patterns):
+    """Get the filenames matching the glob patterns, a single one or a list."""
     if isinstance(patterns, str):
         patterns = [patterns]
-    for pattern in patterns:
-        for filename in glob.glob(pattern, recursive=True):
-            try:
-                with open(filename, 'r') as f:
-                    data = json.load(f)
-                    all_data.append(data)
-                    file_count += 1
-                print(f"Loaded {filename} with {len(data)} entries")
-            except Exception as e:
-                print(f"Error loading {filename}: {e}")
+    return [filename for pattern in patterns for filename in glob.glob(pattern, recursive=True)]
+
+def load_json_files(filenames):
+    """Load the JSON files, in parallel if there are many."""
+    all_data = []
+    file_count = 0
+    if len(filenames) < MIN_FILES_FOR_POOL:
+        loaded = map(load_json_file, filenames)
+    else:
+        with ProcessPoolExecutor() as executor:
+            loaded = list(executor.map(load_json_file, filenames,
+                                       chunksize=max(1, len(filenames) // (4 * (os.cpu_count() or 1)))))
+    for filename, (repo_data, error, commit_errors) in zip(filenames, loaded):
+        if error is not None:
+            print(f"Error loading {filename}: {error}")
+            continue
+        all_data.append(repo_data)
+        file_count += 1
+        print(f"Loaded {filename} with {len(repo_data.months)} entries")
+        for commit_error in commit_errors:
+            print(commit_error)
     return all_data, file_count
 
 def get_month_range(all_data):
-    """Get the range of months from the earliest to the latest commit."""
-    min_date = None
-    max_date = None
-    for repo_data in all_data:
-        for commit_hash, commit_data in repo_data.items():
-            try:
-                timestamp = datetime.fromisoformat(commit_data['timestamp'])
-                if min_date is None or timestamp < min_date:
-                    min_date = timestamp
-                if max_date is None or timestamp > max_date:
-                    max_date = timestamp
-            except Exception:
-                continue
-    if min_date is None or max_date is None:
-        return []
-    # Generate list of all months in the range
-    months = []
-    current = datetime(min_date.year, min_date.month, 1)
-    end = datetime(max_date.year, max_date.month, 1)
-    while current <= end:
-        months.append(current.strftime('%Y-%m'))
-        # Move to next month
-        if current.month == 12:
-            current = datetime(current.year + 1, 1, 1)
-        else:
-            current = datetime(current.year, current.month + 1, 1)
-    return months
+    """Get the datetime64[M] range of months from the earliest to the latest commit."""
+    all_months = [repo_data.months for repo_data in all_data if len(repo_data.months)]
+    if not all_months:
+        return np.array([], dtype='datetime64[M]')
+    first_month = min(months.min() for months in all_months)
+    last_month = max(months.max() for months in all_months)
+    # Generate all months in the range
+    return np.arange(first_month, last_month + 1)
 
 def aggregate_by_month(all_data):
-    """Aggregate data by month, carrying forward values for missing months."""
+    """Aggregate data by month, carrying forward values for missing months.
+
+    Returns a dict with the sorted datetime64[M] months under 'months' and
+    one int64 array aligned with them for each of SIZE_FIELDS.
+    """
     # Get the full range of months
     all_months = get_month_range(all_data)
-    if not all_months:
-        return {}
-    # Initialize monthly totals
-    monthly_totals = {month: {'git_size': 0, 'annex_size': 0, 'total_size': 0} for month in all_months}
-    # Process each repository
-    for repo_data in all_data:
-        # Convert repository data to chronological list
-        repo_commits = []
-        for commit_hash, commit_data in repo_data.items():
-            try:
-                timestamp = datetime.fromisoformat(commit_data['timestamp'])
-                repo_commits.append({
-                    'month': timestamp.strftime('%Y-%m'),
-                    'git_size': commit_data['git_size'],
-                    'annex_size': commit_data['annex_size'],
-                    'total_size': commit_data['total_size']
-                })
-            except Exception as e:
-                print(f"Error processing commit {commit_hash}: {e}")
-        # Sort by month
-        repo_commits.sort(key=lambda x: x['month'])
-        # Find the largest total size for each month in this repo
-        repo_monthly = {}
-        for commit in repo_commits:
-            month = commit['month']
-            if month not in repo_monthly or commit['total_size'] > repo_monthly[month]['total_size']:
-                repo_monthly[month] = commit
-        # Carry forward values for missing months
-        last_values = {'git_size': 0, 'annex_size': 0, 'total_size': 0}
-        for month in all_months:
-            if month in repo_monthly:
-                # Update with this month's values
-                last_values = {
-                    'git_size': repo_monthly[month]['git_size'],
-                    'annex_size': repo_monthly[month]['annex_size'],
-                    'total_size': repo_monthly[month]['total_size']
-                }
-            # Add to monthly totals (either new values or carried forward)
-            monthly_totals[month]['git_size'] += last_values['git_size']
-            monthly_totals[month]['annex_size'] += last_values['annex_size']
-            monthly_totals[month]['total_size'] += last_values['total_size']
-    return monthly_totals
+    if not len(all_months):
+        return {'months': all_months,
+                **{field: np.zeros(0, dtype=np.int64) for field in SIZE_FIELDS}}
+    first_month = all_months[0]
+    # Commits of all repositories in one pass: the repository and month
+    # index of each commit, and its sizes in one row
+    repo_ids = np.repeat(np.arange(len(all_data)), [len(repo_data.months) for repo_data in all_data])
+    months = (np.concatenate([repo_data.months for repo_data in all_data]) - first_month).astype(np.int64)
+    sizes = np.column_stack([np.concatenate([getattr(repo_data, field) for repo_data in all_data])
+                             for field in SIZE_FIELDS])
+    # Group the commits by repo and month, in a stable order
+    keys = repo_ids * len(all_months) + months
+    order = np.argsort(keys, kind='stable')
+    keys, sizes = keys[order], sizes[order]
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+    # Find the largest total size for each month of each repo, and keep the
+    # first commit of that month with it
+    largest = np.maximum.reduceat(sizes[:, 2], starts)
+    candidates = np.flatnonzero(sizes[:, 2] == np.repeat(largest, np.diff(starts, append=len(keys))))
+    rows = candidates[np.r_[True, keys[candidates[1:]] != keys[candidates[:-1]]]]
+    repo_ids, months = np.divmod(keys[rows], len(all_months))
+    sizes = sizes[rows]
+    # Carry forward values for missing months: only record how the sizes of
+    # each repo change at months with data, from 0 at its first month; the
+    # cumulative sum below holds them
+    changes = np.diff(sizes, axis=0, prepend=0)
+    repo_start = np.ones(len(repo_ids), dtype=bool)
+    repo_start[1:] = repo_ids[1:] != repo_ids[:-1]
+    changes[repo_start] = sizes[repo_start]
+    # Changes of the git, annex and total sizes summed over all repositories,
+    # one row per month
+    monthly_changes = np.zeros((len(all_months), len(SIZE_FIELDS)), dtype=np.int64)
+    np.add.at(monthly_changes, months, changes)
+    # Turn the changes into the monthly totals in place
+    monthly_totals = np.cumsum(monthly_changes, axis=0, out=monthly_changes)
+    return {'months': all_months,
+            **{field: monthly_totals[:, i] for i, field in enumerate(SIZE_FIELDS)}}
 
 def calculate_groups_total(group_data):
     """Calculate the total across all groups for each month, carrying forward the last known size."""
     # Find all months across all groups
-    all_months = set()
-    for monthly_data in group_data.values():
-        all_months.update(monthly_data.keys())
-    all_months = sorted(all_months)
-    
-    # Initialize total data structure
-    total_data = {month: {'git_size': 0, 'annex_size': 0, 'total_size': 0} for month in all_months}
-    
+    all_months = np.unique(np.concatenate([monthly_data['months'] for monthly_data in group_data.values()]))
+    # Sizes of each group aligned to all months, zero before its first month
+    stack = np.zeros((len(group_data), len(all_months), len(SIZE_FIELDS)), dtype=np.int64)
+
     # For each group, carry forward the last known size for each month
+    for group_idx, monthly_data in enumerate(group_data.values()):
+        # Index of the last month of the group not after each month, -1 if none
+        last_known = np.searchsorted(monthly_data['months'], all_months, side='right') - 1
+        known = last_known >= 0
+        sizes = np.column_stack([monthly_data[field] for field in SIZE_FIELDS])
+        stack[group_idx, known] = sizes[last_known[known]]
+
+    totals = np.add.reduce(stack, axis=0)
+    return {'months': all_months, **{field: totals[:, i] for i, field in enumerate(SIZE_FIELDS)}}
+
+def write_cache_file(cache_filename, write):
+    """Atomically create a cache file with `write`, called with a binary file object.
+
+    The content is written to a temporary file in CACHE_DIR first, so an
+    interrupted or concurrent run never leaves a partial cache file.
+    """
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    fd, tmp_filename = tempfile.mkstemp(dir=CACHE_DIR, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            write(f)
+        os.replace(tmp_filename, cache_filename)
+    except BaseException:
+        os.unlink(tmp_filename)
+        raise
+
+def get_aggregate_cache_filename(filenames):
+    """Get the filename the monthly aggregate of the files is cached under.
+
+    Returns None if a file can't be stat'ed (e.g. a broken symlink to
+    missing annexed content); such files are not cached but reported when
+    loading them.
+    """
+    key = hashlib.blake2b(digest_size=20)
+    # Changes to this script may change the aggregation
+    with open(__file__, 'rb') as f:
+        key.update(f.read())
+    for filename in sorted(filenames):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            return None
+        key.update(json.dumps([os.path.abspath(filename), stat.st_mtime_ns, stat.st_size]).encode())
+    return os.path.join(CACHE_DIR, f"agg-{key.hexdigest()}.npz")
+
+def load_and_aggregate(patterns, use_cache=True):
+    """Load the JSON files matching the patterns and aggregate them by month.
+
+    Returns the monthly data and the number of loaded files, or None and 0
+    if there is no data.  The monthly data is cached in CACHE_DIR, keyed by
+    the names and modification times of the files.
+    """
+    filenames = expand_patterns(patterns)
+    cache_filename = get_aggregate_cache_filename(filenames) if use_cache and filenames else None
+    if cache_filename and os.path.exists(cache_filename):
+        try:
+            with np.load(cache_filename) as cached:
+                monthly_data = {'months': cached['months'], **{field: cached[field] for field in SIZE_FIELDS}}
+                file_count = int(cached['file_count'])
+        except Exception as e:
+            # Aggregate the files again, overwriting the damaged cache file
+            print(f"Error loading cached monthly data from {cache_filename}: {e}")
+        else:
+            print(f"Loaded {file_count} files aggregated before from {cache_filename}")
+            return monthly_data, file_count
+    all_data, file_count = load_json_files(filenames)
+    if not all_data:
+        return None, 0
+    monthly_data = aggregate_by_month(all_data)
+    if cache_filename:
+        try:
+            write_cache_file(cache_filename,
+                             lambda f: np.savez_compressed(f, file_count=file_count, **monthly_data))
+        except OSError as e:
+            print(f"Could not cache the monthly data in {CACHE_DIR}: {e}")
+    return monthly_data, file_count
+
+def can_show_plots():
+    """Whether the matplotlib backend can display plots, not only save them."""
+    return matplotlib.get_backend().lower() not in NON_INTERACTIVE_BACKENDS
+
+def get_plot_cache_filename(group_data, repo_counts, args):
+    """Get the filename the plot of the data with the given arguments is cached under."""
+    key = hashlib.blake2b(digest_size=20)
+    # Changes to this script or matplotlib may change the rendering
+    with open(__file__, 'rb') as f:
+        key.update(f.read())
+    plot_args = {name: value for name, value in vars(args).items() if name not in NON_PLOT_ARGS}
+    key.update(json.dumps([matplotlib.__version__, plot_args], sort_keys=True).encode())
     for group_name, monthly_data in group_data.items():
-        # Get sorted months for this group
-        group_months = sorted(monthly_data.keys())
-        
-        # Track the last known sizes
-        last_known = {'git_size': 0, 'annex_size': 0, 'total_size': 0}
-        
-        # For each month in the full range
-        for month in all_months:
-            # If this month exists in the group data, update the last known size
-            if month in monthly_data:
-                last_known = {
-                    'git_size': monthly_data[month]['git_size'],
-                    'annex_size': monthly_data[month]['annex_size'],
-                    'total_size': monthly_data[month]['total_size']
-                }
-            
-            # Add the last known size to the total for this month
-            total_data[month]['git_size'] += last_known['git_size']
-            total_data[month]['annex_size'] += last_known['annex_size']
-            total_data[month]['total_size'] += last_known['total_size']
-    
-    return total_data
+        key.update(json.dumps([group_name, repo_counts[group_name]]).encode())
+        key.update(monthly_data['months'].tobytes())
+        for field in SIZE_FIELDS:
+            key.update(monthly_data[field].tobytes())
+    # The extension selects the output format
+    return os.path.join(CACHE_DIR, key.hexdigest() + os.path.splitext(args.output)[1])
+
+def lttb_indices(x, y, max_points):
+    """Select at most max_points indices of the (x, y) points of a line to plot.
+
+    Uses the Largest-Triangle-Three-Buckets algorithm: the first and last
+    points are kept, and from each bucket in between the point forming the
+    largest triangle with the previously selected point and the average of
+    the next bucket.
+    """
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # Bucket boundaries of the points between the first and the last
+    edges = np.linspace(1, n - 1, max_points - 1).astype(np.int64)
+    indices = np.empty(max_points, dtype=np.int64)
+    indices[0] = 0
+    indices[-1] = n - 1
+    a = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_end = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        areas = np.abs((x[a] - next_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (next_y - y[a]))
+        a = start + np.argmax(areas)
+        indices[i + 1] = a
+    return indices
+
+def format_size(size):
+    """Format a size in bytes as humanize.naturalsize(size, binary=True) does, but cheaper."""
+    if abs(size) < 1024:
+        return '1 Byte' if abs(size) == 1 else f"{int(size)} Bytes"
+    # frexp gives the power of 2 of the size, so the unit without a logarithm
+    exp = min((math.frexp(size)[1] - 1) // 10, len(SIZE_UNITS) - 1)
+    mantissa = size / (1 << (10 * exp))
+    # Rounding may reach the next unit, e.g. 1023.96 KiB is 1.0 MiB
+    if round(abs(mantissa), 1) >= 1024 and exp < len(SIZE_UNITS) - 1:
+        exp += 1
+        mantissa /= 1024
+    return f"{mantissa:.1f} {SIZE_UNITS[exp]}"
 
-def create_plot(group_data, repo_counts, output_filename, title, use_log_scale, show_components, include_count, plot_groups_total, min_total_size):
+def create_plot(group_data, repo_counts, output_filename, title, use_log_scale, show_components, include_count, plot_groups_total, min_total_size, max_points=0, show=True, dpi=150):
     """Create a plot of the monthly data with humanized size labels for multiple groups."""
-    plt.figure(figsize=(12, 8))
+    fig = plt.figure(figsize=(12, 8))
     # Define a color cycle for the groups
     colors = plt.cm.tab10.colors
     color_cycle = itertools.cycle(colors)
@@ -214,6 +386,18 @@ def create_plot(group_data, repo_counts, output_filename, title, use_log_scale,
     
     # Keep track of all dates for x-axis
     all_dates = set()
+    # Lines of all groups are drawn as one collection per style: their
+    # segments, colors and widths, and legend entries in the order added
+    lines = {field: ([], [], []) for field in styles}
+    legend_handles = []
+
+    def add_line(field, dates, sizes, color, linewidth, label):
+        segments, line_colors, linewidths = lines[field]
+        segments.append(np.column_stack([mdates.date2num(dates), sizes]))
+        line_colors.append(color)
+        linewidths.append(linewidth)
+        legend_handles.append(Line2D([], [], color=color, linestyle=styles[field],
+                                     linewidth=linewidth, label=label))
     
     # Calculate total across all groups if requested
     if plot_groups_total and len(group_data) > 1:
@@ -225,28 +409,25 @@ def create_plot(group_data, repo_counts, output_filename, title, use_log_scale,
     # Find the first date when total size reaches the minimum for each group
     first_valid_dates = {}
     for group_name, monthly_data in group_data.items():
-        sorted_months = sorted(monthly_data.keys())
-        for month in sorted_months:
-            if monthly_data[month]['total_size'] >= min_total_size:
-                first_valid_dates[group_name] = datetime.strptime(month, '%Y-%m')
-                break
+        # Sizes may shrink, so the totals are not sorted for a searchsorted
+        above_minimum = monthly_data['total_size'] >= min_total_size
+        if above_minimum.any():
+            first_valid_dates[group_name] = monthly_data['months'][np.argmax(above_minimum)]
     
     # Plot each group
     for group_idx, (group_name, monthly_data) in enumerate(group_data.items()):
-        # Sort months chronologically
-        sorted_months = sorted(monthly_data.keys())
-        
-        # Filter months based on minimum total size
-        valid_months = []
-        for month in sorted_months:
-            if monthly_data[month]['total_size'] >= min_total_size:
-                valid_months.append(month)
+        # Filter months (already chronological) based on minimum total size
+        valid = np.flatnonzero(monthly_data['total_size'] >= min_total_size)
+        if max_points:
+            # Keep the shape of the total size line over the months shown,
+            # which skip those below the minimum size
+            valid = valid[lttb_indices(valid, monthly_data['total_size'][valid], max_points)]
+        dates = monthly_data['months'][valid]
         
-        if not valid_months:
+        if not len(dates):
             print(f"Group '{group_name}' has no data above the minimum size threshold")
             continue
             
-        dates = [datetime.strptime(month, '%Y-%m') for month in valid_months]
         all_dates.update(dates)
         
         # Get the color for this group
@@ -258,8 +439,8 @@ def create_plot(group_data, repo_counts, output_filename, title, use_log_scale,
             group_color = next(color_cycle)
         
         # Get the latest total size for this group
-        latest_month = sorted(valid_months)[-1]
-        latest_total_size = monthly_data[latest_month]['total_size']
+        latest = valid[-1]
+        latest_total_size = monthly_data['total_size'][latest]
         latest_total_size_str = humanize.naturalsize(latest_total_size, binary=True)
         
         # Create label with repository count and total size
@@ -272,36 +453,40 @@ def create_plot(group_data, repo_counts, output_filename, title, use_log_scale,
         # Plot the components based on user preference
         if show_components:
             # Get latest component sizes
-            latest_git_size = monthly_data[latest_month]['git_size']
-            latest_annex_size = monthly_data[latest_month]['annex_size']
+            latest_git_size = monthly_data['git_size'][latest]
+            latest_annex_size = monthly_data['annex_size'][latest]
             latest_git_size_str = humanize.naturalsize(latest_git_size, binary=True)
             latest_annex_size_str = humanize.naturalsize(latest_annex_size, binary=True)
             
             # Extract and plot git size
-            git_sizes = [monthly_data[month]['git_size'] for month in valid_months]
-            plt.plot(dates, git_sizes,
-                     color=group_color, linestyle=styles['git_size'],
-                     label=f'{group_name} - Git ({latest_git_size_str})', linewidth=2)
+            git_sizes = monthly_data['git_size'][valid]
+            add_line('git_size', dates, git_sizes, group_color, 2,
+                     f'{group_name} - Git ({latest_git_size_str})')
             
             # Extract and plot annex size
-            annex_sizes = [monthly_data[month]['annex_size'] for month in valid_months]
-            plt.plot(dates, annex_sizes,
-                     color=group_color, linestyle=styles['annex_size'],
-                     label=f'{group_name} - Git-Annex ({latest_annex_size_str})', linewidth=2)
+            annex_sizes = monthly_data['annex_size'][valid]
+            add_line('annex_size', dates, annex_sizes, group_color, 2,
+                     f'{group_name} - Git-Annex ({latest_annex_size_str})')
             
             # Extract and plot total size
-            total_sizes = [monthly_data[month]['total_size'] for month in valid_months]
-            plt.plot(dates, total_sizes,
-                     color=group_color, linestyle=styles['total_size'],
-                     label=f'{group_name} - Total ({latest_total_size_str})', linewidth=2)
+            total_sizes = monthly_data['total_size'][valid]
+            add_line('total_size', dates, total_sizes, group_color, 2,
+                     f'{group_name} - Total ({latest_total_size_str})')
         else:
             # Only plot total size
-            total_sizes = [monthly_data[month]['total_size'] for month in valid_months]
-            plt.plot(dates, total_sizes,
-                     color=group_color, linestyle=styles['total_size'],
-                     label=base_label,
-                     linewidth=group_linewidth,
-                     )
+            total_sizes = monthly_data['total_size'][valid]
+            add_line('total_size', dates, total_sizes, group_color, group_linewidth, base_label)
+    
+    ax = plt.gca()
+    for field, (segments, line_colors, linewidths) in lines.items():
+        if segments:
+            # Open, unfilled polygons draw like a LineCollection, but unlike
+            # those are avoided by the 'best' legend location
+            ax.add_collection(PolyCollection(segments, closed=False, facecolors='none',
+                                             edgecolors=line_colors, linewidths=linewidths,
+                                             linestyles=styles[field]))
+    ax.xaxis_date()
+    ax.autoscale_view()
     
     # Format the plot
     plt.title(title, fontsize=16)
@@ -316,25 +501,28 @@ def create_plot(group_data, repo_counts, output_filename, title, use_log_scale,
         plt.yscale('log')
     
     # Format the x-axis to show dates nicely
-    plt.gca().xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
-    plt.gca().xaxis.set_major_locator(mdates.MonthLocator(interval=3))
+    ax.xaxis.set_major_formatter(mdates.DateFormatter('%Y-%m'))
+    ax.xaxis.set_major_locator(mdates.MonthLocator(interval=3))
     plt.xticks(rotation=45)
     
     # Format y-axis with humanized sizes
-    def size_formatter(x, pos):
-        return humanize.naturalsize(x, binary=True)
-    
-    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(size_formatter))
+    ax.yaxis.set_major_formatter(plt.FuncFormatter(lambda x, pos: format_size(x)))
     plt.grid(True, linestyle='--', alpha=0.7)
-    plt.legend(fontsize=10, loc='best')
+    plt.legend(handles=legend_handles, fontsize=10, loc='best')
     plt.tight_layout()
     
     # Save the plot
-    plt.savefig(output_filename, dpi=300)
+    if os.path.splitext(output_filename)[1].lower() in VECTOR_EXTENSIONS:
+        plt.savefig(output_filename)
+    else:
+        plt.savefig(output_filename, dpi=dpi)
     print(f"Plot saved to {output_filename}")
     
     # Also display it if running in an interactive environment
-    plt.show()
+    if show and can_show_plots():
+        plt.show()
+    plt.close(fig)
+
 def main():
     args = parse_args()
     
@@ -353,19 +541,18 @@ def main():
             group_patterns = group[1:]
             print(f"Processing group '{group_name}' with patterns: {group_patterns}")
             
-            # Load JSON files for this group
-            group_json_data, file_count = load_json_files(group_patterns)
-            if group_json_data:
-                # Aggregate data for this group
-                group_data[group_name] = aggregate_by_month(group_json_data)
+            # Load and aggregate JSON files for this group
+            monthly_data, file_count = load_and_aggregate(group_patterns, not args.no_cache)
+            if monthly_data is not None:
+                group_data[group_name] = monthly_data
                 repo_counts[group_name] = file_count
             else:
                 print(f"No data found for group '{group_name}'")
     else:
         # Process single pattern (no groups)
-        all_data, file_count = load_json_files(args.input_pattern)
-        if all_data:
-            group_data['All'] = aggregate_by_month(all_data)
+        monthly_data, file_count = load_and_aggregate(args.input_pattern, not args.no_cache)
+        if monthly_data is not None:
+            group_data['All'] = monthly_data
             repo_counts['All'] = file_count
         else:
             print("No data found. Check the input pattern.")
@@ -376,6 +563,15 @@ def main():
         print("No valid data found in any of the JSON files.")
         return
     
+    # Reuse the plot rendered before from the same data and options, unless
+    # it is to be displayed too
+    cache_filename = None if args.no_cache else get_plot_cache_filename(group_data, repo_counts, args)
+    show = not args.no_show and can_show_plots()
+    if cache_filename and not show and os.path.exists(cache_filename):
+        shutil.copyfile(cache_filename, args.output)
+        print(f"Plot saved to {args.output} (cached)")
+        return
+
     # Create the plot
     create_plot(
         group_data,
@@ -386,8 +582,17 @@ def main():
         args.separate_components,
         args.include_count,
         args.plot_groups_total,
-        min_total_size
+        min_total_size,
+        args.max_points,
+        show,
+        args.dpi
     )
+    if cache_filename:
+        try:
+            with open(args.output, 'rb') as f:
+                write_cache_file(cache_filename, lambda cache_file: shutil.copyfileobj(f, cache_file))
+        except OSError as e:
+            print(f"Could not cache the plot in {CACHE_DIR}: {e}")
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,75 @@
+import asyncio
+import importlib.util
+import os
+import shutil
+import subprocess
+import tempfile
+import unittest
+
+spec = importlib.util.spec_from_file_location(
+    'git_annex_log_stats',
+    os.path.join(os.path.dirname(__file__), os.pardir, 'git-annex-log-stats.py'))
+stats = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(stats)
+
+
+def git(repo_path, *args, input=None):
+    return subprocess.run(['git', '-C', repo_path, *args], input=input, check=True,
+                          capture_output=True).stdout.decode().strip()
+
+
+class MissingBlobTest(unittest.TestCase):
+    """Lookups keep in step with the batch processes when a blob is missing."""
+
+    def setUp(self):
+        self.repo_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.repo_path)
+        git(self.repo_path, 'init', '-q')
+        self.blobs = {content: git(self.repo_path, 'hash-object', '-w', '--stdin', input=content)
+                      for content in (b'aaaaa', b'bbbbbbb', b'cccccccccc')}
+        # Remove the loose object of the second blob
+        missing = self.blobs[b'bbbbbbb']
+        os.remove(os.path.join(self.repo_path, '.git', 'objects', missing[:2], missing[2:]))
+
+    def test_blob_sizes(self):
+        async def run():
+            proc = await stats.start_cat_file_batch_check(self.repo_path)
+            try:
+                size_lookup = stats.SizeLookup(proc)
+                with self.assertRaises(RuntimeError):
+                    await size_lookup._get_blob_sizes([sha.encode() for sha in self.blobs.values()])
+                # Answers of the failed lookup must not be read by the next one
+                sha = self.blobs[b'cccccccccc'].encode()
+                size_lookup.blob_sizes.clear()
+                await size_lookup._get_blob_sizes([sha])
+                return size_lookup.blob_sizes
+            finally:
+                await proc.stop()
+
+        blob_sizes = asyncio.run(run())
+        self.assertEqual(blob_sizes, {self.blobs[b'cccccccccc'].encode(): 10})
+
+    def test_annex_key_sizes(self):
+        link = b'../.git/annex/objects/Xx/Yy/SHA256E-s1234--0123.dat/SHA256E-s1234--0123.dat'
+        link_sha = git(self.repo_path, 'hash-object', '-w', '--stdin', input=link)
+
+        async def run():
+            proc = await stats.start_cat_file_batch(self.repo_path)
+            try:
+                size_lookup = stats.SizeLookup(None, proc)
+                with self.assertRaises(RuntimeError):
+                    await size_lookup._get_annex_key_sizes(
+                        [(self.blobs[b'aaaaa'].encode(), False),
+                         (self.blobs[b'bbbbbbb'].encode(), False),
+                         (self.blobs[b'cccccccccc'].encode(), False)])
+                # Answers of the failed lookup must not be read by the next one
+                await size_lookup._get_annex_key_sizes([(link_sha.encode(), False)])
+                return size_lookup.annex_key_sizes[link_sha.encode()]
+            finally:
+                await proc.stop()
+
+        self.assertEqual(asyncio.run(run()), 1234)
+
+
+if __name__ == '__main__':
+    unittest.main()